@@ -0,0 +1,19 @@
+-- Numeric projection of dbo.IoT_AirQuality used by streamlit_app.py.
+-- The raw table stores readings as text with unit suffixes ("12.5 µg/m³");
+-- stripping them here keeps the dashboard query down to plain AVGs over FLOATs.
+-- One REPLACE of the unit per column plus trimming covers both "12.5 µg/m³" and
+-- "12.5µg/m³". NULLIF keeps a blank or unit-only value NULL rather than 0, and any
+-- other unparseable text stays NULL too, matching the pandas fallback.
+-- Run once against the Synapse database before deploying the app.
+CREATE VIEW dbo.vw_IoT_AirQuality_Numeric
+AS
+SELECT
+    region,
+    TRY_CAST(NULLIF(LTRIM(RTRIM(REPLACE(pm25, 'µg/m³', ''))), '') AS FLOAT) AS pm25_f,
+    TRY_CAST(NULLIF(LTRIM(RTRIM(REPLACE(pm10, 'µg/m³', ''))), '') AS FLOAT) AS pm10_f,
+    TRY_CAST(NULLIF(LTRIM(RTRIM(REPLACE(no2, 'µg/m³', ''))), '') AS FLOAT) AS no2_f,
+    TRY_CAST(NULLIF(LTRIM(RTRIM(REPLACE(co2, 'ppm', ''))), '') AS FLOAT) AS co2_f,
+    TRY_CAST(NULLIF(LTRIM(RTRIM(REPLACE(temperature, '°C', ''))), '') AS FLOAT) AS temperature_f,
+    TRY_CAST(NULLIF(LTRIM(RTRIM(REPLACE(humidity, '%', ''))), '') AS FLOAT) AS humidity_f,
+    timestamp
+FROM dbo.IoT_AirQuality;
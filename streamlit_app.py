@@ -1,10 +1,12 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from datetime import datetime, timedelta
+from datetime import date
 import pyodbc
 import os
+import queue
+import threading
+from contextlib import contextmanager
 
 st.set_page_config(
     page_title="Egypt Air Quality",
@@ -12,44 +14,303 @@ st.set_page_config(
     layout="wide"
 )
 
-# Custom CSS
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .success-box {
-        background-color: #d4edda;
-        color: #155724;
-        padding: 1rem;
-        border-radius: 5px;
-        border-left: 4px solid #28a745;
-        margin: 1rem 0;
-    }
-    .warning-box {
-        background-color: #fff3cd;
-        color: #856404;
-        padding: 1rem;
-        border-radius: 5px;
-        border-left: 4px solid #ffc107;
-        margin: 1rem 0;
-    }
-    .info-box {
-        background-color: #d1ecf1;
-        color: #0c5460;
-        padding: 1rem;
-        border-radius: 5px;
-        border-left: 4px solid #17a2b8;
-        margin: 1rem 0;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-EGYPT_REGIONS = ["Red Sea", "Delta", "Greater Cairo", "Sinai", "New Valley", 
-                 "Upper Egypt", "North Coast", "Canal Cities"]
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "app.css")
+
+@st.cache_data(show_spinner=False)
+def load_css(path=CSS_PATH):
+    """Custom stylesheet, read from disk once per process"""
+    with open(path, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+TROUBLESHOOTING_TIPS = """
+**Possible issues:**
+1. Check database credentials in Secrets
+2. Verify view exists: `dbo.vw_IoT_AirQuality_Numeric` (see `sql/`)
+3. Ensure data exists for selected period
+4. Check network connectivity
+"""
+
+EGYPT_REGIONS = ("Red Sea", "Delta", "Greater Cairo", "Sinai", "New Valley", 
+                 "Upper Egypt", "North Coast", "Canal Cities")
+REGION_OPTIONS = ("All Regions", *EGYPT_REGIONS)
+REGION_SET = frozenset(REGION_OPTIONS)
+
+POOL_SIZE = 4
+POOL_TIMEOUT = 30
+QUERY_CACHE_TTL = 60
+QUERY_CACHE_ENTRIES = 32
+# Windows this long are cached on disk per calendar day; a day's lag barely moves their averages
+HISTORICAL_WINDOW_DAYS = 60
+HISTORICAL_CACHE_ENTRIES = 64
+FETCH_BATCH_SIZE = 10000
+# Part of every result cache key; bump whenever query_air_quality_data's return shape
+# changes so entries persisted on disk in the old shape are never handed back
+RESULT_SCHEMA_VERSION = 2
+
+# Averages of μg/m³/°C/% readings need nowhere near float64 precision, and
+# Arrow-backed strings keep the cached frame smaller than object columns
+AIR_QUALITY_DTYPES = {
+    "Region": "string[pyarrow]",
+    "PM2_5": "float32",
+    "PM10": "float32",
+    "NO2": "float32",
+    "CO2": "float32",
+    "Temperature": "float32",
+    "Humidity": "float32",
+    "Readings": "int32",
+}
+
+class ConnectionPool:
+    """Bounded pool of live pyodbc connections sharing one connection string"""
+    def __init__(self, conn_str, size=POOL_SIZE):
+        self.conn_str = conn_str
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+    
+    @contextmanager
+    def connection(self, timeout=POOL_TIMEOUT):
+        """Check out (conn, reused), opening a new connection only when none are idle"""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Timed out waiting for a pooled Synapse connection")
+        conn = None
+        try:
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = pyodbc.connect(self.conn_str, autocommit=True), False
+            yield conn, reused
+        except (pyodbc.OperationalError, pyodbc.InterfaceError):
+            # Drop broken connections instead of handing them out again; a failed
+            # statement (e.g. ProgrammingError) leaves the connection usable
+            if conn is not None:
+                self._close_quietly(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put_nowait(conn)
+            self._slots.release()
+    
+    def run(self, work):
+        """Call work(conn) on a pooled connection, retrying once if a reused idle link was dropped"""
+        reused = False
+        try:
+            with self.connection() as (conn, reused):
+                return work(conn)
+        except (pyodbc.OperationalError, pyodbc.InterfaceError) as e:
+            # A fresh connection failing (server down) or a query timeout won't go better twice
+            if not reused or e.args[0] == "HYT00":
+                raise
+            # Idle connections usually die together (server idle timeout), so start fresh
+            self.discard_idle()
+            with self.connection() as (conn, _):
+                return work(conn)
+    
+    def discard_idle(self):
+        """Close every idle connection so the next checkout opens a new one"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close_quietly(conn)
+    
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+@st.cache_resource
+def get_connection_pool(conn_str):
+    """One pool per connection string, shared across reruns and sessions"""
+    return ConnectionPool(conn_str)
+
+@st.cache_resource
+def get_missing_views():
+    """Connection strings whose database lacks vw_IoT_AirQuality_Numeric, remembered per process"""
+    return set()
+
+# Unit suffixes are stripped by the view (sql/vw_IoT_AirQuality_Numeric.sql).
+# Only two statement texts ever reach Synapse: with and without the region filter.
+# ROLLUP adds an overall row (Is_Total = 1) averaged over every reading, not over regions.
+_AIR_QUALITY_SELECT = """
+    SELECT 
+        region as Region,
+        AVG(pm25_f) as PM2_5,
+        AVG(pm10_f) as PM10,
+        AVG(no2_f) as NO2,
+        AVG(co2_f) as CO2,
+        AVG(temperature_f) as Temperature,
+        AVG(humidity_f) as Humidity,
+        COUNT(*) as Readings,
+        MIN(timestamp) as Period_Start,
+        MAX(timestamp) as Period_End,
+        GROUPING(region) as Is_Total
+    FROM dbo.vw_IoT_AirQuality_Numeric
+    WHERE timestamp >= DATEADD(day, -?, GETDATE())
+"""
+# pyodbc binds str as NVARCHAR; casting keeps a VARCHAR region column seekable
+REGION_FILTER = " AND region = CAST(? AS VARCHAR(64))"
+
+_AIR_QUALITY_GROUPING = " GROUP BY ROLLUP(region) ORDER BY Is_Total, region"
+
+AIR_QUALITY_QUERY = _AIR_QUALITY_SELECT + _AIR_QUALITY_GROUPING
+AIR_QUALITY_REGION_QUERY = _AIR_QUALITY_SELECT + REGION_FILTER + _AIR_QUALITY_GROUPING
+
+# Fallback for databases without vw_IoT_AirQuality_Numeric
+RAW_READINGS_QUERY = """
+    SELECT region, pm25, pm10, no2, co2, temperature, humidity, timestamp
+    FROM dbo.IoT_AirQuality
+    WHERE timestamp >= DATEADD(day, -?, GETDATE())
+"""
+RAW_READINGS_REGION_QUERY = RAW_READINGS_QUERY + REGION_FILTER
+
+# Raw text column -> aggregate column
+READING_COLUMNS = {
+    "pm25": "PM2_5",
+    "pm10": "PM10",
+    "no2": "NO2",
+    "co2": "CO2",
+    "temperature": "Temperature",
+    "humidity": "Humidity",
+}
+
+# Unit suffix of each raw text column
+UNIT_SUFFIXES = {
+    "pm25": "µg/m³",
+    "pm10": "µg/m³",
+    "no2": "µg/m³",
+    "co2": "ppm",
+    "temperature": "°C",
+    "humidity": "%",
+}
+
+def aggregate_raw_readings(chunks):
+    """Strip unit suffixes in pandas and aggregate per region like the view query does
+    
+    Each chunk is folded into per-region sums and counts as it arrives, so memory
+    stays bounded by FETCH_BATCH_SIZE rather than by the length of the window.
+    """
+    metrics = list(READING_COLUMNS.values())
+    sums, counts, spans = [], [], []
+    for raw in chunks:
+        readings = pd.DataFrame({
+            name: pd.to_numeric(
+                raw[column].str.strip().str.removesuffix(UNIT_SUFFIXES[column]).str.rstrip(),
+                errors="coerce"
+            )
+            for column, name in READING_COLUMNS.items()
+        })
+        readings["Region"] = raw["region"]
+        readings["timestamp"] = raw["timestamp"]
+        
+        grouped = readings.groupby("Region", sort=False, dropna=False)
+        sums.append(grouped[metrics].sum())
+        counts.append(grouped[metrics].count())
+        spans.append(grouped["timestamp"].agg(["size", "min", "max"]))
+    
+    # AVG ignores NULLs, so divide by the non-null count of each metric
+    sums = pd.concat(sums).groupby(level=0, dropna=False).sum()
+    counts = pd.concat(counts).groupby(level=0, dropna=False).sum()
+    span = pd.concat(spans).groupby(level=0, dropna=False).agg({"size": "sum", "min": "min", "max": "max"})
+    df = sums / counts
+    df["Readings"] = span["size"]
+    df["Period_Start"] = span["min"]
+    df["Period_End"] = span["max"]
+    df["Is_Total"] = 0
+    
+    # Same overall row as ROLLUP(region): weighted by readings, not a mean of region means
+    total = (sums.sum() / counts.sum()).to_frame().T
+    total["Readings"] = span["size"].sum()
+    total["Period_Start"] = span["min"].min()
+    total["Period_End"] = span["max"].max()
+    total["Is_Total"] = 1
+    
+    # ORDER BY Is_Total, region: SQL Server sorts a NULL region first
+    df = df.rename_axis("Region").reset_index().sort_values("Region", na_position="first", ignore_index=True)
+    return pd.concat([df, total], ignore_index=True)
+
+def iter_frames(conn, query, params=()):
+    """Run a query and yield the result as DataFrames of at most FETCH_BATCH_SIZE rows
+    
+    Always yields at least one (possibly empty) frame so callers keep the column names.
+    """
+    cursor = conn.cursor()
+    cursor.arraysize = FETCH_BATCH_SIZE
+    try:
+        cursor.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchmany()
+        while True:
+            yield pd.DataFrame.from_records(rows, columns=columns)
+            if len(rows) < cursor.arraysize:
+                return
+            rows = cursor.fetchmany()
+            if not rows:
+                return
+    finally:
+        cursor.close()
+
+def read_frame(conn, query, params=()):
+    """Run a query and build one DataFrame from its batches"""
+    return pd.concat(iter_frames(conn, query, params), ignore_index=True)
+
+def query_air_quality_data(conn_str, region=None, days=30):
+    """Regional air quality aggregates straight from Synapse, plus the overall totals row"""
+    # Bound parameters keep the statement text stable so Synapse reuses its plan
+    if region and region != "All Regions":
+        query, raw_query, params = AIR_QUALITY_REGION_QUERY, RAW_READINGS_REGION_QUERY, (days, region)
+    else:
+        query, raw_query, params = AIR_QUALITY_QUERY, RAW_READINGS_QUERY, (days,)
+
+    pool = get_connection_pool(conn_str)
+    missing_views = get_missing_views()
+    df = None
+    if conn_str not in missing_views:
+        try:
+            df = pool.run(lambda conn: read_frame(conn, query, params))
+        except pyodbc.ProgrammingError as e:
+            # 42S02: the numeric view hasn't been deployed, so stop asking for it
+            if e.args[0] != "42S02":
+                raise
+            missing_views.add(conn_str)
+    if df is None:
+        # Parse the raw readings here instead
+        df = pool.run(lambda conn: aggregate_raw_readings(iter_frames(conn, raw_query, params)))
+
+    df = df.astype(AIR_QUALITY_DTYPES)
+    for column in ("Period_Start", "Period_End"):
+        df[column] = pd.to_datetime(df[column], errors="coerce")
+    
+    is_total = df.pop("Is_Total").astype(bool)
+    totals = df[is_total].iloc[0] if is_total.any() else None
+    return df[~is_total].reset_index(drop=True), totals
+
+@st.cache_data(ttl=QUERY_CACHE_TTL, max_entries=QUERY_CACHE_ENTRIES, show_spinner=False)
+def fetch_recent_air_quality(conn_str, region, days, schema):
+    """(regional aggregates, totals) cached in memory for QUERY_CACHE_TTL seconds"""
+    return query_air_quality_data(conn_str, region, days)
+
+# persist="disk" ignores ttl, so freshness comes from the day in the cache key
+@st.cache_data(persist="disk", max_entries=HISTORICAL_CACHE_ENTRIES, show_spinner=False)
+def fetch_historical_air_quality(conn_str, region, days, day, schema):
+    """(regional aggregates, totals) cached on disk for the given day"""
+    return query_air_quality_data(conn_str, region, days)
+
+def fetch_air_quality_data(conn_str, region=None, days=30):
+    """Cached regional aggregates and totals: in memory for QUERY_CACHE_TTL seconds, or on disk for the day for long windows"""
+    if days >= HISTORICAL_WINDOW_DAYS:
+        return fetch_historical_air_quality(conn_str, region, days, date.today().isoformat(), RESULT_SCHEMA_VERSION)
+    return fetch_recent_air_quality(conn_str, region, days, RESULT_SCHEMA_VERSION)
+
+def odbc_quote(value):
+    """Brace-quote an ODBC attribute value so ; { } in secrets can't break the string"""
+    value = str(value)
+    if any(c in value for c in ";{}=") or value != value.strip():
+        return "{" + value.replace("}", "}}") + "}"
+    return value
 
 class SynapseConnection:
     def __init__(self):
@@ -59,22 +320,33 @@ class SynapseConnection:
             self.username = st.secrets["SYNAPSE_USERNAME"]
             self.password = st.secrets["SYNAPSE_PASSWORD"]
             self.connected = True
+            self.config_error = None
         except Exception as e:
             self.connected = False
-            st.error(f"Secrets configuration error: {str(e)}")
+            self.config_error = str(e)
+            self.connection_string = None
+            return
+        
+        attributes = {
+            "DRIVER": "{ODBC Driver 17 for SQL Server}",
+            "SERVER": odbc_quote(self.server),
+            "DATABASE": odbc_quote(self.database),
+            "UID": odbc_quote(self.username),
+            "PWD": odbc_quote(self.password),
+            "Encrypt": "yes",
+            "TrustServerCertificate": "no",
+            "ApplicationIntent": "ReadOnly",
+            "Connection Timeout": "30",
+        }
+        self.connection_string = ";".join(f"{key}={value}" for key, value in attributes.items())
     
     def get_connection_string(self):
-        """Create proper ODBC connection string for Azure Synapse"""
-        return f"""
-            DRIVER=ODBC Driver 17 for SQL Server;
-            SERVER={self.server};
-            DATABASE={self.database};
-            UID={self.username};
-            PWD={self.password};
-            Encrypt=yes;
-            TrustServerCertificate=no;
-            Connection Timeout=30;
-        """
+        """ODBC connection string for Azure Synapse, built once from the secrets"""
+        return self.connection_string
+    
+    def get_pool(self):
+        """Shared connection pool for these credentials"""
+        return get_connection_pool(self.get_connection_string())
     
     def test_connection(self):
         """Test database connection with pyodbc"""
@@ -82,16 +354,12 @@ class SynapseConnection:
             return False, "Credentials not configured"
             
         try:
-            conn_str = self.get_connection_string()
-            conn = pyodbc.connect(conn_str)
-            
             # Test with simple query
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 as test")
-            result = cursor.fetchone()
-            conn.close()
+            result = self.get_pool().run(
+                lambda conn: conn.cursor().execute("SELECT 1 as test").fetchval()
+            )
             
-            if result and result[0] == 1:
+            if result == 1:
                 return True, "✅ Successfully connected to Azure Synapse"
             else:
                 return False, "❌ Connection test failed"
@@ -104,51 +372,143 @@ class SynapseConnection:
             return False, f"❌ Connection Error: {str(e)}"
     
     def get_air_quality_data(self, region=None, days=30):
-        """Get real data from Azure Synapse"""
+        """Get real data from Azure Synapse as (regional aggregates, totals row)"""
         if not self.connected:
-            return pd.DataFrame()
+            return pd.DataFrame(), None
+        
+        # Region comes from a closed set; anything else never reaches Synapse
+        if region is not None and region not in REGION_SET:
+            st.error(f"❌ Unknown region: {region}")
+            return pd.DataFrame(), None
             
         try:
-            conn_str = self.get_connection_string()
-            conn = pyodbc.connect(conn_str)
+            return fetch_air_quality_data(self.get_connection_string(), region, days)
             
-            # Build query for your data structure
-            base_query = f"""
-            SELECT 
-                region as Region,
-                AVG(TRY_CAST(REPLACE(REPLACE(pm25, ' µg/m³', ''), 'µg/m³', '') as FLOAT)) as PM2_5,
-                AVG(TRY_CAST(REPLACE(REPLACE(pm10, ' µg/m³', ''), 'µg/m³', '') as FLOAT)) as PM10,
-                AVG(TRY_CAST(REPLACE(REPLACE(no2, ' µg/m³', ''), 'µg/m³', '') as FLOAT)) as NO2,
-                AVG(TRY_CAST(REPLACE(REPLACE(co2, ' ppm', ''), 'ppm', '') as FLOAT)) as CO2,
-                AVG(TRY_CAST(REPLACE(REPLACE(temperature, ' °C', ''), '°C', '') as FLOAT)) as Temperature,
-                AVG(TRY_CAST(REPLACE(REPLACE(humidity, ' %', ''), '%', '') as FLOAT)) as Humidity,
-                COUNT(*) as Readings,
-                MIN(timestamp) as Period_Start,
-                MAX(timestamp) as Period_End
-            FROM dbo.IoT_AirQuality
-            WHERE CAST(timestamp as DATETIME) >= DATEADD(day, -{days}, GETDATE())
-            """
-            
-            if region and region != "All Regions":
-                base_query += f" AND region = '{region}'"
+        except Exception as e:
+            st.error(f"❌ Database query failed: {str(e)}")
+            return pd.DataFrame(), None
+
+def pm25_bar_figure(regions, pm25, title):
+    """PM2.5 per region, coloured green to red by level"""
+    import plotly.graph_objects as go  # deferred: only needed once data is charted
+    fig = go.Figure(go.Bar(
+        x=regions,
+        y=pm25,
+        marker=dict(
+            color=pm25,
+            colorscale=['green', 'yellow', 'red'],
+            showscale=True,
+            colorbar=dict(title='PM2_5')
+        )
+    ))
+    fig.update_layout(title=title, xaxis_title='Region', yaxis_title='PM2_5')
+    return fig
+
+def grouped_bar_figure(regions, series, title):
+    """Side-by-side bars for several (name, values) metrics per region"""
+    import plotly.graph_objects as go
+    fig = go.Figure([go.Bar(name=name, x=regions, y=values) for name, values in series])
+    fig.update_layout(title=title, barmode='group', xaxis_title='Region', yaxis_title='value')
+    return fig
+
+def figure_series(df, columns):
+    """(name, values) pairs for grouped_bar_figure"""
+    return [(col, df[col].to_numpy()) for col in columns]
+
+@st.cache_resource
+def get_db():
+    """SynapseConnection shared across reruns instead of re-reading secrets each time"""
+    return SynapseConnection()
+
+def render_summary_metrics(data_df, totals):
+    """Headline metrics from the overall totals row fetched with the regional frame"""
+    st.subheader("📈 Summary Metrics")
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Regions", len(data_df))
+    with col2:
+        st.metric("Avg PM2.5", f"{totals['PM2_5']:.1f} μg/m³")
+    with col3:
+        st.metric("Avg Temperature", f"{totals['Temperature']:.1f} °C")
+    with col4:
+        total_readings = totals['Readings']
+        st.metric("Total Readings", f"{total_readings:,}")
+
+def render_charts(data_df, region, days):
+    """Charts for the selected region, built from an already-fetched frame"""
+    st.subheader("📊 Visualizations")
+    
+    regions = data_df['Region'].to_numpy()
+    if region == "All Regions":
+        # Comparison chart
+        fig1 = pm25_bar_figure(
+            regions,
+            data_df['PM2_5'].to_numpy(),
+            f"PM2.5 Levels by Region (Last {days} days)"
+        )
+        st.plotly_chart(fig1, use_container_width=True)
+        
+        # Multi-metric chart
+        fig2 = grouped_bar_figure(
+            regions,
+            figure_series(data_df, ['PM2_5', 'Temperature']),
+            f"Environmental Comparison (Last {days} days)"
+        )
+        st.plotly_chart(fig2, use_container_width=True)
+    else:
+        # Single region focus
+        fig = grouped_bar_figure(
+            regions,
+            figure_series(data_df, ['PM2_5', 'PM10', 'NO2']),
+            f"Pollutant Levels in {region} (Last {days} days)"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def query_panel(db, region, days):
+    """Query button and results; clicking it reruns only this fragment"""
+    clicked = st.button("🚀 Query Real Database", type="primary", use_container_width=True)
+    
+    # Keep the last query on screen across reruns until the selection changes. Only the
+    # selection is remembered: the data is re-read through the result cache, so it is
+    # never older than that cache allows.
+    if clicked or st.session_state.get('last_query') == (region, days):
+        with st.spinner("Fetching real-time data from Azure Synapse..."):
+            data_df, totals = db.get_air_quality_data(region, days)
+        
+        # totals is None only when the fetch failed; don't bring a failure back on later reruns
+        if totals is not None:
+            st.session_state['last_query'] = (region, days)
+        else:
+            st.session_state.pop('last_query', None)
+        
+        if not data_df.empty:
+            st.markdown(f'<div class="success-box">✅ Successfully retrieved data for {len(data_df)} regions</div>', unsafe_allow_html=True)
             
-            base_query += " GROUP BY region ORDER BY region"
+            render_summary_metrics(data_df, totals)
             
-            df = pd.read_sql(base_query, conn)
-            conn.close()
+            # Display data
+            st.subheader("📋 Detailed Data")
+            st.dataframe(data_df, use_container_width=True)
             
-            return df
+            render_charts(data_df, region, days)
             
-        except Exception as e:
-            st.error(f"❌ Database query failed: {str(e)}")
-            return pd.DataFrame()
+        else:
+            st.markdown('<div class="warning-box">❌ No data returned from database</div>', unsafe_allow_html=True)
+            st.markdown(TROUBLESHOOTING_TIPS)
 
 def main():
+    st.markdown(load_css(), unsafe_allow_html=True)
     st.markdown('<h1 class="main-header">🇪🇬 Egypt Air Quality</h1>', unsafe_allow_html=True)
   
     
     # Initialize database connection
-    db = SynapseConnection()
+    db = get_db()
+    if not db.connected:
+        st.error(f"Secrets configuration error: {db.config_error}")
+        # Don't keep a misconfigured instance around once secrets are fixed
+        get_db.clear()
     
     # Sidebar
     st.sidebar.header("🎛️ Control Panel")
@@ -156,7 +516,7 @@ def main():
     # Analysis controls
     region = st.sidebar.selectbox(
         "📍 Select Region", 
-        ["All Regions"] + EGYPT_REGIONS
+        REGION_OPTIONS
     )
     
     days = st.sidebar.slider("📅 Analysis Period (Days)", 1, 90, 30)
@@ -165,77 +525,7 @@ def main():
     # Main content
     st.subheader("Egypt Air Quality")
     
-    if st.button("🚀 Query Real Database", type="primary", use_container_width=True):
-        with st.spinner("Fetching real-time data from Azure Synapse..."):
-            data_df = db.get_air_quality_data(region, days)
-            
-            if not data_df.empty:
-                st.markdown(f'<div class="success-box">✅ Successfully retrieved data for {len(data_df)} regions</div>', unsafe_allow_html=True)
-                
-                # Display summary
-                st.subheader("📈 Summary Metrics")
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    st.metric("Regions", len(data_df))
-                with col2:
-                    avg_pm25 = data_df['PM2_5'].mean()
-                    st.metric("Avg PM2.5", f"{avg_pm25:.1f} μg/m³")
-                with col3:
-                    avg_temp = data_df['Temperature'].mean()
-                    st.metric("Avg Temperature", f"{avg_temp:.1f} °C")
-                with col4:
-                    total_readings = data_df['Readings'].sum()
-                    st.metric("Total Readings", f"{total_readings:,}")
-                
-                # Display data
-                st.subheader("📋 Detailed Data")
-                st.dataframe(data_df, use_container_width=True)
-                
-                # Create visualizations
-                st.subheader("📊 Visualizations")
-                
-                if region == "All Regions":
-                    # Comparison chart
-                    fig1 = px.bar(
-                        data_df,
-                        x='Region',
-                        y='PM2_5',
-                        title=f"PM2.5 Levels by Region (Last {days} days)",
-                        color='PM2_5',
-                        color_continuous_scale=['green', 'yellow', 'red']
-                    )
-                    st.plotly_chart(fig1, use_container_width=True)
-                    
-                    # Multi-metric chart
-                    fig2 = px.bar(
-                        data_df,
-                        x='Region',
-                        y=['PM2_5', 'Temperature'],
-                        title=f"Environmental Comparison (Last {days} days)",
-                        barmode='group'
-                    )
-                    st.plotly_chart(fig2, use_container_width=True)
-                else:
-                    # Single region focus
-                    fig = px.bar(
-                        data_df,
-                        x='Region',
-                        y=['PM2_5', 'PM10', 'NO2'],
-                        title=f"Pollutant Levels in {region} (Last {days} days)",
-                        barmode='group'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-            else:
-                st.markdown('<div class="warning-box">❌ No data returned from database</div>', unsafe_allow_html=True)
-                st.markdown("""
-                **Possible issues:**
-                1. Check database credentials in Secrets
-                2. Verify table exists: `dbo.IoT_AirQuality`
-                3. Ensure data exists for selected period
-                4. Check network connectivity
-                """)
+    query_panel(db, region, days)
     
 
 if __name__ == "__main__":